@@ -1,10 +1,15 @@
+import sys
 from abc import ABC
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
+from types import BuiltinFunctionType
 from typing import Callable
 
-from .ctx import Ctx
+from lark.tree import Tree
+
+from .ctx import Ctx, PURE_BUILTINS
 from .runtime import (
-    LoxFunction, LoxReturn, print as lox_print,
+    LoxError, LoxFunction, LoxReturn, print as lox_print,
     lox_add, lox_sub, lox_mul, lox_div, lox_eq, lox_ne,
     lox_gt, lox_ge, lox_lt, lox_le, lox_not, lox_neg, truthy,
     LoxClass, LoxInstance  # Adiciona LoxInstance para exportação
@@ -37,6 +42,18 @@ class Expr(Node, ABC):
     funções, etc.
     """
 
+    __slots__ = ()
+
+    def compile(self) -> Callable[[Ctx], "Value"]:
+        """
+        Compila o nó para uma função `f(ctx)` equivalente a `self.eval`.
+
+        A compilação resolve filhos, constantes e operadores uma única vez,
+        de modo que a execução não precise percorrer a árvore novamente.
+        A implementação padrão simplesmente reutiliza o método `eval`.
+        """
+        return self.eval
+
 
 class Stmt(Node, ABC):
     """
@@ -46,8 +63,18 @@ class Stmt(Node, ABC):
     execução do código ou declaram elementos como classes, funções, etc.
     """
 
+    __slots__ = ()
 
-@dataclass
+    def compile(self) -> Callable[[Ctx], "Value"]:
+        """
+        Compila o comando para uma função `f(ctx)` equivalente a `self.eval`.
+
+        Veja `Expr.compile`.
+        """
+        return self.eval
+
+
+@dataclass(slots=True)
 class Program(Node):
     """
     Representa um programa.
@@ -56,16 +83,43 @@ class Program(Node):
     """
 
     stmts: list[Stmt]
+    _compiled: list = field(init=False, repr=False, compare=False)
 
     def eval(self, ctx: Ctx):
-        for stmt in self.stmts:
-            stmt.eval(ctx)
+        # Compila os comandos uma única vez; execuções subsequentes apenas
+        # percorrem a lista de funções já resolvidas.
+        try:
+            thunks = self._compiled
+        except AttributeError:
+            thunks = self._compiled = [stmt.compile() for stmt in self.stmts]
+        for thunk in thunks:
+            thunk(ctx)
 
 
 #
 # EXPRESSÕES
 #
-@dataclass
+
+# Tabelas que resolvem o nome do operador para a função que o implementa.
+_OPS: dict[str, Callable] = {
+    '+': lox_add,
+    '-': lox_sub,
+    '*': lox_mul,
+    '/': lox_div,
+    '==': lox_eq,
+    '!=': lox_ne,
+    '>': lox_gt,
+    '>=': lox_ge,
+    '<': lox_lt,
+    '<=': lox_le,
+}
+_UNARY_OPS: dict[str, Callable] = {
+    '-': lox_neg,
+    '!': lox_not,
+}
+
+
+@dataclass(slots=True)
 class BinOp(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -76,35 +130,43 @@ class BinOp(Expr):
     left: Expr
     right: Expr
     op: str
+    _fn: Callable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Resolve o operador uma única vez, na construção do nó. Assim o
+        # eval faz uma única chamada indireta em vez de comparar strings.
+        try:
+            self._fn = _OPS[self.op]
+        except KeyError:
+            raise RuntimeError(f"Operador desconhecido: {self.op}") from None
 
     def eval(self, ctx: Ctx):
-        left_value = self.left.eval(ctx)
-        right_value = self.right.eval(ctx)
-        if self.op == '+':
-            return lox_add(left_value, right_value)
-        elif self.op == '-':
-            return lox_sub(left_value, right_value)
-        elif self.op == '*':
-            return lox_mul(left_value, right_value)
-        elif self.op == '/':
-            return lox_div(left_value, right_value)
-        elif self.op == '==':
-            return lox_eq(left_value, right_value)
-        elif self.op == '!=':
-            return lox_ne(left_value, right_value)
-        elif self.op == '>':
-            return lox_gt(left_value, right_value)
-        elif self.op == '>=':
-            return lox_ge(left_value, right_value)
-        elif self.op == '<':
-            return lox_lt(left_value, right_value)
-        elif self.op == '<=':
-            return lox_le(left_value, right_value)
-        else:
-            raise RuntimeError(f"Operador desconhecido: {self.op}")
+        return self._fn(self.left.eval(ctx), self.right.eval(ctx))
+
+    def compile(self):
+        op = self._fn
+        # Dobra constantes: 2 + 3 vira um valor pré-calculado.
+        if isinstance(self.left, Literal) and isinstance(self.right, Literal):
+            try:
+                folded = op(self.left.value, self.right.value)
+            except LoxError:
+                pass  # o erro deve acontecer em tempo de execução
+            else:
+                def const(ctx):
+                    return folded
 
+                return const
 
-@dataclass(frozen=True)
+        left = self.left.compile()
+        right = self.right.compile()
+
+        def binop(ctx):
+            return op(left(ctx), right(ctx))
+
+        return binop
+
+
+@dataclass(frozen=True, slots=True)
 class Var(Expr):
     """
     Uma variável no código
@@ -114,11 +176,32 @@ class Var(Expr):
 
     name: str
 
+    def __post_init__(self):
+        # Interna o nome: nomes repetidos compartilham a mesma string e as
+        # buscas em dicionário comparam por identidade no caso comum.
+        if type(self.name) is str:
+            object.__setattr__(self, "name", sys.intern(self.name))
+
     def eval(self, ctx: Ctx):
         return ctx[self.name]
 
+    def compile(self):
+        name = self.name
 
-@dataclass
+        def var(ctx):
+            # Percorre a cadeia de escopos diretamente, sem uma chamada
+            # recursiva de Ctx.__getitem__ por nível.
+            while ctx is not None:
+                scope = ctx.scope
+                if name in scope:
+                    return scope[name]
+                ctx = ctx.parent
+            raise KeyError(f"Variable '{name}' not found in context.")
+
+        return var
+
+
+@dataclass(slots=True)
 class Literal(Expr):
     """
     Representa valores literais no código, ex.: strings, booleanos,
@@ -132,12 +215,53 @@ class Literal(Expr):
     def eval(self, ctx: Ctx):
         return self.value
 
+    def compile(self):
+        value = self.value
+
+        def literal(ctx):
+            return value
+
+        return literal
+
 
 def is_lox_false(value):
     return not truthy(value)
 
 
-@dataclass
+class _NotConst(Exception):
+    """
+    Sinaliza que uma expressão não pode ser avaliada em tempo de compilação.
+    """
+
+
+def _fold_const(expr: Expr) -> Value:
+    """
+    Avalia expressões formadas apenas por literais (e operadores sobre eles).
+
+    Levanta `_NotConst` se a expressão depender do contexto de execução.
+    """
+    if isinstance(expr, Literal):
+        return expr.value
+    if isinstance(expr, BinOp):
+        return expr._fn(_fold_const(expr.left), _fold_const(expr.right))
+    if isinstance(expr, UnaryOp):
+        return expr._fn(_fold_const(expr.value))
+    raise _NotConst
+
+
+def _truthy_const(expr: Expr) -> bool | None:
+    """
+    Retorna a veracidade de uma condição constante ou None se a condição não
+    for constante (ou se a avaliação constante produzir um erro, que deve
+    acontecer em tempo de execução).
+    """
+    try:
+        return truthy(_fold_const(expr))
+    except (_NotConst, LoxError):
+        return None
+
+
+@dataclass(slots=True)
 class And(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -154,8 +278,21 @@ class And(Expr):
             return left_value
         return self.right.eval(ctx)
 
+    def compile(self):
+        left = self.left.compile()
+        right = self.right.compile()
 
-@dataclass
+        def and_(ctx):
+            # Teste de veracidade embutido: evita uma chamada a truthy por visita.
+            left_value = left(ctx)
+            if left_value is None or left_value is False:
+                return left_value
+            return right(ctx)
+
+        return and_
+
+
+@dataclass(slots=True)
 class Or(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -171,8 +308,21 @@ class Or(Expr):
             return left_value
         return self.right.eval(ctx)
 
+    def compile(self):
+        left = self.left.compile()
+        right = self.right.compile()
 
-@dataclass
+        def or_(ctx):
+            # Teste de veracidade embutido: evita uma chamada a truthy por visita.
+            left_value = left(ctx)
+            if left_value is None or left_value is False:
+                return right(ctx)
+            return left_value
+
+        return or_
+
+
+@dataclass(slots=True)
 class UnaryOp(Expr):
     """
     Uma operação prefixa com um operando.
@@ -182,18 +332,40 @@ class UnaryOp(Expr):
 
     op: str   # Ex: '-' ou '!'
     value: Expr
+    _fn: Callable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        try:
+            self._fn = _UNARY_OPS[self.op]
+        except KeyError:
+            raise RuntimeError(f"Operador unário desconhecido: {self.op}") from None
 
     def eval(self, ctx: Ctx):
-        v = self.value.eval(ctx)
-        if self.op == '-':
-            return lox_neg(v)
-        elif self.op == '!':
-            return lox_not(v)
-        else:
-            raise RuntimeError(f"Operador unário desconhecido: {self.op}")
+        return self._fn(self.value.eval(ctx))
+
+    def compile(self):
+        op = self._fn
+        # Dobra constantes: -2 ou !true viram um valor pré-calculado.
+        if isinstance(self.value, Literal):
+            try:
+                folded = op(self.value.value)
+            except LoxError:
+                pass  # o erro deve acontecer em tempo de execução
+            else:
+                def const(ctx):
+                    return folded
+
+                return const
+
+        value = self.value.compile()
 
+        def unary(ctx):
+            return op(value(ctx))
 
-@dataclass(frozen=True)
+        return unary
+
+
+@dataclass(frozen=True, slots=True)
 class Call(Expr):
     """
     Uma chamada de função.
@@ -202,13 +374,77 @@ class Call(Expr):
     """
     func: Expr
     args: list
+    _memo: dict = field(init=False, repr=False, compare=False)
+    _fetchers: tuple = field(init=False, repr=False, compare=False)
+    _const_args: bool = field(init=False, repr=False, compare=False)
 
     def eval(self, ctx: Ctx):
+        # Compila os argumentos uma única vez em uma lista de "fetchers";
+        # avaliações seguintes só percorrem a tupla de funções prontas.
+        try:
+            fetchers = self._fetchers
+        except AttributeError:
+            fetchers = tuple(arg.compile() for arg in self.args)
+            object.__setattr__(self, "_fetchers", fetchers)
         func_value = self.func.eval(ctx)
-        arg_values = [arg.eval(ctx) for arg in self.args]
+        arg_values = [fn(ctx) for fn in fetchers]
+        if (
+            self._args_const()
+            and isinstance(func_value, BuiltinFunctionType)
+            and func_value in PURE_BUILTINS
+        ):
+            return self._pure_call(func_value, arg_values)
         return func_value(*arg_values)
 
-
+    def _args_const(self) -> bool:
+        # Só memoizamos chamadas cujos argumentos são todos literais: os
+        # valores se repetem a cada avaliação do nó, então o memo fica
+        # limitado ao número de funções distintas que o callee resolve —
+        # argumentos dependentes do contexto (ex.: sqrt(i) num laço)
+        # cresceriam sem limite e custariam mais que a própria chamada.
+        try:
+            return self._const_args
+        except AttributeError:
+            const = all(isinstance(arg, Literal) for arg in self.args)
+            object.__setattr__(self, "_const_args", const)
+            return const
+
+    def _pure_call(self, func_value, arg_values):
+        # Memoiza chamadas a builtins referencialmente transparentes.
+        try:
+            memo = self._memo
+        except AttributeError:
+            memo = {}
+            object.__setattr__(self, "_memo", memo)
+        key = (func_value, *arg_values)
+        try:
+            if key in memo:
+                return memo[key]
+        except TypeError:  # argumento não hasheável
+            return func_value(*arg_values)
+        result = memo[key] = func_value(*arg_values)
+        return result
+
+    def compile(self):
+        func = self.func.compile()
+        arg_fns = tuple(arg.compile() for arg in self.args)
+        const_args = self._args_const()
+
+        def call(ctx):
+            func_value = func(ctx)
+            arg_values = [fn(ctx) for fn in arg_fns]
+            if (
+                const_args
+                and isinstance(func_value, BuiltinFunctionType)
+                and func_value in PURE_BUILTINS
+            ):
+                return self._pure_call(func_value, arg_values)
+            return func_value(*arg_values)
+
+        return call
+
+
+# Sem slots: testes introspectam o __dict__ deste nó.
 @dataclass
 class Getattr(Expr):
     """
@@ -219,17 +455,38 @@ class Getattr(Expr):
     obj: Expr
     attr: str
 
+    # Cache inline de despacho: guarda a última classe vista e a função de
+    # acesso correspondente, evitando repetir o teste de tipo a cada visita.
+    _cache_class: type | None = field(default=None, init=False, repr=False, compare=False)
+    _cache_get: Callable | None = field(default=None, init=False, repr=False, compare=False)
+
     def eval(self, ctx: Ctx):
-        obj_value = self.obj.eval(ctx)
+        return self._getattr(self.obj.eval(ctx))
+
+    def _getattr(self, obj_value):
+        klass = type(obj_value)
+        if klass is self._cache_class:
+            return self._cache_get(obj_value, self.attr)
         # Para instâncias de LoxInstance, usa o método get
-        if hasattr(obj_value, '__class__') and 'LoxInstance' in str(obj_value.__class__):
-            return obj_value.get(self.attr)
+        if isinstance(obj_value, LoxInstance):
+            getter = klass.get
         # Para outros objetos Python, usa getattr
         else:
-            return getattr(obj_value, self.attr)
+            getter = getattr
+        self._cache_class = klass
+        self._cache_get = getter
+        return getter(obj_value, self.attr)
 
+    def compile(self):
+        obj = self.obj.compile()
 
-@dataclass
+        def getattr_(ctx):
+            return self._getattr(obj(ctx))
+
+        return getattr_
+
+
+@dataclass(slots=True)
 class Setattr(Expr):
     """
     Representa atribuição a atributo de um objeto.
@@ -244,15 +501,31 @@ class Setattr(Expr):
         obj_value = self.obj.eval(ctx)
         value_result = self.value.eval(ctx)
         # Para instâncias de LoxInstance, usa o método set
-        if hasattr(obj_value, '__class__') and 'LoxInstance' in str(obj_value.__class__):
+        if isinstance(obj_value, LoxInstance):
             obj_value.set(self.attr, value_result)
         # Para outros objetos Python, usa setattr
         else:
             setattr(obj_value, self.attr, value_result)
         return value_result
 
+    def compile(self):
+        obj = self.obj.compile()
+        value = self.value.compile()
+        attr = self.attr
 
-@dataclass
+        def setattr_(ctx):
+            obj_value = obj(ctx)
+            value_result = value(ctx)
+            if isinstance(obj_value, LoxInstance):
+                obj_value.set(attr, value_result)
+            else:
+                setattr(obj_value, attr, value_result)
+            return value_result
+
+        return setattr_
+
+
+@dataclass(slots=True)
 class This(Expr):
     """
     Acesso ao `this`.
@@ -276,14 +549,42 @@ class This(Expr):
     def eval(self, ctx: Ctx):
         return ctx["this"]
 
+    def compile(self):
+        def this(ctx):
+            return ctx["this"]
+
+        return this
+
     def validate_self(self, cursor: Cursor):
         # Deve ser descendente de algum nó do tipo Class
-        for parent_cursor in cursor.parents():
-            if isinstance(parent_cursor.node, Class):
-                return
-        raise SemanticError("'this' só pode ser usado dentro de métodos de uma classe.")
+        if cursor.nearest(Class) is None:
+            raise SemanticError("'this' só pode ser usado dentro de métodos de uma classe.")
 
-@dataclass
+_MISSING = object()
+
+
+def _super_this(ctx: Ctx) -> tuple:
+    """
+    Busca 'super' e 'this' em uma única caminhada pela cadeia de escopos.
+    """
+    superclass = this = _MISSING
+    while ctx is not None:
+        scope = ctx.scope
+        if superclass is _MISSING and "super" in scope:
+            superclass = scope["super"]
+        if this is _MISSING and "this" in scope:
+            this = scope["this"]
+        if superclass is not _MISSING and this is not _MISSING:
+            break
+        ctx = ctx.parent
+    if superclass is _MISSING:
+        raise KeyError("Variable 'super' not found in context.")
+    if this is _MISSING:
+        raise KeyError("Variable 'this' not found in context.")
+    return superclass, this
+
+
+@dataclass(slots=True)
 class Super(Expr):
     """
     Acesso a method ou atributo da superclasse.
@@ -294,38 +595,42 @@ class Super(Expr):
 
     def eval(self, ctx: Ctx):
         method_name = self.attr
-        superclass = ctx["super"]
-        this = ctx["this"]
+        superclass, this = _super_this(ctx)
         method = superclass.get_method(method_name)
         if method is None:
             raise RuntimeError(f"Superclasse não tem método '{method_name}'")
         return method.bind(this)
 
+    def compile(self):
+        method_name = self.attr
+
+        def super_(ctx):
+            superclass, this = _super_this(ctx)
+            method = superclass.get_method(method_name)
+            if method is None:
+                raise RuntimeError(f"Superclasse não tem método '{method_name}'")
+            return method.bind(this)
+
+        return super_
+
     def validate_self(self, cursor: Cursor):
         # Deve ser descendente de algum nó do tipo Class que tenha superclasse
-        for parent_cursor in cursor.parents():
-            if isinstance(parent_cursor.node, Class):
-                klass = parent_cursor.node
-                superclass_field = klass.superclass
-                # Desaninha listas/árvores
-                while isinstance(superclass_field, list):
-                    if not superclass_field:
-                        superclass_field = None
-                        break
-                    superclass_field = superclass_field[0]
-                try:
-                    from lark.tree import Tree
-                    if isinstance(superclass_field, Tree):
-                        superclass_field = None
-                except ImportError:
-                    pass
-                if superclass_field is not None:
-                    return
-                else:
-                    raise SemanticError("'super' só pode ser usado em classes que herdam de outra classe.")
-        raise SemanticError("'super' só pode ser usado dentro de métodos de uma classe.")
+        class_cursor = cursor.nearest(Class)
+        if class_cursor is None:
+            raise SemanticError("'super' só pode ser usado dentro de métodos de uma classe.")
+        superclass_field = class_cursor.node.superclass
+        # Desaninha listas/árvores
+        while isinstance(superclass_field, list):
+            if not superclass_field:
+                superclass_field = None
+                break
+            superclass_field = superclass_field[0]
+        if isinstance(superclass_field, Tree):
+            superclass_field = None
+        if superclass_field is None:
+            raise SemanticError("'super' só pode ser usado em classes que herdam de outra classe.")
 
-@dataclass
+@dataclass(slots=True)
 class Return(Stmt):
     """
     Representa uma instrução de retorno.
@@ -338,14 +643,20 @@ class Return(Stmt):
         value = self.expr.eval(ctx)
         raise LoxReturn(value)
 
+    def compile(self):
+        expr = self.expr.compile()
+
+        def return_(ctx):
+            raise LoxReturn(expr(ctx))
+
+        return return_
+
     def validate_self(self, cursor: Cursor):
         # Deve ser descendente de algum nó do tipo Function
-        for parent_cursor in cursor.parents():
-            if isinstance(parent_cursor.node, Function):
-                return
-        raise SemanticError("'return' só pode ser usado dentro de funções.")
+        if cursor.nearest(Function) is None:
+            raise SemanticError("'return' só pode ser usado dentro de funções.")
 
-@dataclass
+@dataclass(slots=True)
 class VarDef(Stmt):
     """
     Representa uma declaração de variável.
@@ -361,15 +672,29 @@ class VarDef(Stmt):
         ctx.var_def(self.name, v)  # Cria a variável no escopo atual
         return v
 
+    def compile(self):
+        name = self.name
+        value = self.value.compile()
+
+        def var_def(ctx):
+            v = value(ctx)
+            ctx.var_def(name, v)
+            return v
+
+        return var_def
+
     def validate_self(self, cursor: Cursor):
         # Duplicidade no mesmo bloco
         parent = cursor.parent().node if not cursor.is_root() else None
         if isinstance(parent, Block):
-            names = [stmt.name for stmt in parent.stmts if isinstance(stmt, VarDef)]
-            if names.count(self.name) > 1:
-                raise SemanticError("variável duplicada no bloco", token=self.name)
-
-@dataclass
+            count = 0
+            for stmt in parent.stmts:
+                if isinstance(stmt, VarDef) and stmt.name == self.name:
+                    count += 1
+                    if count > 1:
+                        raise SemanticError("variável duplicada no bloco", token=self.name)
+
+@dataclass(slots=True)
 class If(Stmt):
     """
     Representa uma instrução condicional.
@@ -388,18 +713,94 @@ class If(Stmt):
             return self.else_branch.eval(ctx)
         return None
 
+    def compile(self):
+        # Condições constantes selecionam o ramo em tempo de compilação.
+        const = _truthy_const(self.cond)
+        if const is True:
+            return self.then_branch.compile()
+        elif const is False:
+            if self.else_branch is None:
+                return lambda ctx: None
+            return self.else_branch.compile()
+
+        cond = self.cond.compile()
+        then_branch = self.then_branch.compile()
+        if self.else_branch is None:
+            def if_(ctx):
+                if truthy(cond(ctx)):
+                    return then_branch(ctx)
+                return None
+        else:
+            else_branch = self.else_branch.compile()
 
-@dataclass
+            def if_(ctx):
+                if truthy(cond(ctx)):
+                    return then_branch(ctx)
+                return else_branch(ctx)
+
+        return if_
+
+
+@dataclass(slots=True)
 class While(Stmt):
     cond: Expr
     body: Stmt
 
     def eval(self, ctx: Ctx):
-        while self.cond.eval(ctx):
+        # Usa a noção de veracidade do Lox (nil/false são falsos; todo o
+        # resto, inclusive 0 e "", é verdadeiro), não a do Python.
+        while truthy(self.cond.eval(ctx)):
             self.body.eval(ctx)
 
+    def compile(self):
+        # Condições constantes dispensam a reavaliação por iteração.
+        const = _truthy_const(self.cond)
+        if const is False:
+            return lambda ctx: None
+        cond = None if const is True else self.cond.compile()
+
+        # Se o corpo é um bloco que não declara funções nem classes, nada
+        # pode capturar o escopo do bloco; reutilizamos o mesmo dicionário em
+        # todas as iterações em vez de alocar um novo a cada volta.
+        body = self.body
+        if isinstance(body, Block) and not any(
+            isinstance(node, (Function, Class)) for node in body.descendants()
+        ):
+            thunks = [stmt.compile() for stmt in body.stmts]
+
+            if cond is None:
+                def while_(ctx):
+                    env = {}
+                    block_ctx = ctx.push(env)
+                    while True:
+                        env.clear()
+                        for thunk in thunks:
+                            thunk(block_ctx)
+            else:
+                def while_(ctx, truthy=truthy):
+                    env = {}
+                    block_ctx = ctx.push(env)
+                    while truthy(cond(ctx)):
+                        env.clear()
+                        for thunk in thunks:
+                            thunk(block_ctx)
+
+            return while_
+
+        body_fn = body.compile()
+        if cond is None:
+            def while_(ctx):
+                while True:
+                    body_fn(ctx)
+        else:
+            def while_(ctx, truthy=truthy):
+                while truthy(cond(ctx)):
+                    body_fn(ctx)
 
-@dataclass
+        return while_
+
+
+@dataclass(slots=True)
 class Block(Stmt):
     """
     Representa bloco de comandos.
@@ -407,22 +808,41 @@ class Block(Stmt):
     Ex.: { var x = 42; print x;  }
     """
     stmts: list[Stmt]
+    _stmt_evals: list = field(init=False, repr=False, compare=False)
 
     def eval(self, ctx: Ctx):
+        # Resolve os métodos eval uma única vez; execuções seguintes apenas
+        # percorrem a lista de métodos já ligados.
+        try:
+            evals = self._stmt_evals
+        except AttributeError:
+            evals = self._stmt_evals = [stmt.eval for stmt in self.stmts]
         ctx = ctx.push({})
-        for stmt in self.stmts:
-            stmt.eval(ctx)
+        for stmt_eval in evals:
+            stmt_eval(ctx)
         return None
 
+    def compile(self):
+        thunks = [stmt.compile() for stmt in self.stmts]
+
+        def block(ctx):
+            ctx = ctx.push({})
+            for thunk in thunks:
+                thunk(ctx)
+            return None
+
+        return block
+
     def validate_self(self, cursor: Cursor):
-        # Duplicidade de variáveis no bloco
-        names = [stmt.name for stmt in self.stmts if isinstance(stmt, VarDef)]
-        if len(names) != len(set(names)):
-            for name in names:
-                if names.count(name) > 1:
-                    raise SemanticError("variável duplicada no bloco", token=name)
+        # Duplicidade de variáveis no bloco, em uma única passada
+        seen = set()
+        for stmt in self.stmts:
+            if isinstance(stmt, VarDef):
+                if stmt.name in seen:
+                    raise SemanticError("variável duplicada no bloco", token=stmt.name)
+                seen.add(stmt.name)
 
-@dataclass
+@dataclass(slots=True)
 class Function(Stmt):
     """
     Representa uma função.
@@ -433,26 +853,32 @@ class Function(Stmt):
     name: str
     params: list
     body: Stmt
+    _param_names: list = field(init=False, repr=False, compare=False)
+    _body_stmts: list = field(init=False, repr=False, compare=False)
 
-    def eval(self, ctx: Ctx, register=True):
+    def __post_init__(self):
+        # Normaliza parâmetros e corpo uma única vez, na construção do nó,
+        # em vez de refazer o trabalho a cada avaliação.
         # Corrige casos em que params é um Block vazio
         if isinstance(self.params, Block):
-            param_names = []
+            self._param_names = []
         else:
-            param_names = [p.name if hasattr(p, 'name') else p for p in self.params]
+            self._param_names = [p.name if hasattr(p, 'name') else p for p in self.params]
         # Garante que body é uma lista de comandos
         if self.body is None:
-            body_stmts = []
+            self._body_stmts = []
         elif isinstance(self.body, Block):
-            body_stmts = self.body.stmts
+            self._body_stmts = self.body.stmts
         elif isinstance(self.body, list):
-            body_stmts = self.body
+            self._body_stmts = self.body
         else:
-            body_stmts = [self.body]
+            self._body_stmts = [self.body]
+
+    def eval(self, ctx: Ctx, register=True):
         fn = LoxFunction(
             name=self.name,
-            args=param_names,
-            body=body_stmts,
+            args=self._param_names,
+            body=self._body_stmts,
             ctx=ctx
         )
         if register:
@@ -460,20 +886,35 @@ class Function(Stmt):
         return fn
 
     def validate_self(self, cursor: Cursor):
-        # Parâmetros duplicados
-        param_names = [p.name if hasattr(p, 'name') else p for p in self.params] if not isinstance(self.params, Block) else []
-        if len(param_names) != len(set(param_names)):
-            for name in param_names:
-                if param_names.count(name) > 1:
-                    raise SemanticError("parâmetro duplicado", token=name)
+        # Parâmetros duplicados, em uma única passada
+        seen = set()
+        for name in self._param_names:
+            if name in seen:
+                raise SemanticError("parâmetro duplicado", token=name)
+            seen.add(name)
         # Variável no corpo com mesmo nome de parâmetro
-        body_stmts = self.body.stmts if isinstance(self.body, Block) else ([self.body] if self.body else [])
-        var_names = [stmt.name for stmt in body_stmts if isinstance(stmt, VarDef)]
-        for name in var_names:
-            if name in param_names:
-                raise SemanticError("variável colide com parâmetro", token=name)
+        for stmt in self._body_stmts:
+            if isinstance(stmt, VarDef) and stmt.name in seen:
+                raise SemanticError("variável colide com parâmetro", token=stmt.name)
 
-@dataclass
+def _flatten_methods(methods) -> list[Function]:
+    """
+    Desaninha listas (possivelmente aninhadas) de métodos em uma lista plana
+    de Function, iterativamente e com teste de tipo direto.
+    """
+    result = []
+    pending = deque(methods)
+    while pending:
+        m = pending.popleft()
+        if isinstance(m, list):
+            # Reinsere no início para preservar a ordem dos métodos
+            pending.extendleft(reversed(m))
+        elif isinstance(m, Function):
+            result.append(m)
+    return result
+
+
+@dataclass(slots=True)
 class Class(Stmt):
     """
     Representa uma classe.
@@ -492,12 +933,8 @@ class Class(Stmt):
                 superclass_field = None
                 break
             superclass_field = superclass_field[0]
-        try:
-            from lark.tree import Tree
-            if isinstance(superclass_field, Tree):
-                superclass_field = None
-        except ImportError:
-            pass
+        if isinstance(superclass_field, Tree):
+            superclass_field = None
         superclass = None
         if superclass_field is not None:
             superclass = superclass_field.eval(ctx)
@@ -508,15 +945,7 @@ class Class(Stmt):
         class_ctx.var_def(self.name, None)
         # Não pop class_ctx; mantém vivo enquanto a classe existir
         # Garante que methods é uma lista de Function (desaninha listas)
-        def flatten_methods(methods):
-            result = []
-            for m in methods:
-                if isinstance(m, list):
-                    result.extend(flatten_methods(m))
-                elif hasattr(m, 'name') and hasattr(m, 'params') and hasattr(m, 'body'):
-                    result.append(m)
-            return result
-        methods = flatten_methods(self.methods if self.methods is not None else [])
+        methods = _flatten_methods(self.methods if self.methods is not None else [])
         # Herdar métodos da superclasse
         if superclass is not None:
             methods_dict = dict(superclass.methods)
@@ -537,7 +966,7 @@ class Class(Stmt):
         ctx.var_def(self.name, klass)
         return klass
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Expr):
     """
     Representa uma atribuição de variável existente.
@@ -552,12 +981,23 @@ class Assign(Expr):
         ctx.assign(self.name, v)
         return v
 
+    def compile(self):
+        name = self.name
+        value = self.value.compile()
+
+        def assign(ctx):
+            v = value(ctx)
+            ctx.assign(name, v)
+            return v
+
+        return assign
+
     def validate_self(self, cursor: Cursor):
         # Em Lox, atribuições podem ser feitas a variáveis existentes no contexto
         # A validação de existência será feita em runtime
         pass
 
-@dataclass
+@dataclass(slots=True)
 class Print(Stmt):
     """
     Representa um comando de impressão.
@@ -571,5 +1011,15 @@ class Print(Stmt):
         lox_print(value)
         return value
 
+    def compile(self):
+        expr = self.expr.compile()
+
+        def print_(ctx):
+            value = expr(ctx)
+            lox_print(value)
+            return value
+
+        return print_
+
     def validate_self(self, cursor: Cursor):
         pass
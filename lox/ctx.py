@@ -31,6 +31,11 @@ class _Builtins(dict):
 
 BUILTINS = _Builtins()
 
+# Builtins sem efeitos colaterais: para os mesmos argumentos sempre produzem
+# o mesmo resultado, logo suas chamadas podem ser memoizadas. `clock` fica de
+# fora por depender do relógio.
+PURE_BUILTINS = frozenset({math.sqrt, max})
+
 
 @dataclass
 class Ctx:
@@ -53,28 +58,38 @@ class Ctx:
         """
         Obtém o valor de uma variável pelo nome.
         """
-        if name in self.scope:
-            return self.scope[name]
-        elif self.parent is not None:
-            return self.parent[name]
+        # Caminhada iterativa: evita um frame Python por nível de escopo.
+        ctx = self
+        while ctx is not None:
+            scope = ctx.scope
+            if name in scope:
+                return scope[name]
+            ctx = ctx.parent
         raise KeyError(f"Variable '{name}' not found in context.")
 
     def __setitem__(self, name: str, value: "Value") -> None:
         """
         Define o valor de uma variável pelo nome.
         """
-        if name in self.scope:
-            self.scope[name] = value
-        elif self.parent is not None:
-            self.parent[name] = value
-        else:
-            raise KeyError(f"Variable '{name}' not found in context.")
+        ctx = self
+        while ctx is not None:
+            scope = ctx.scope
+            if name in scope:
+                scope[name] = value
+                return
+            ctx = ctx.parent
+        raise KeyError(f"Variable '{name}' not found in context.")
 
     def __contains__(self, name: str) -> bool:
         """
         Verifica se uma variável existe no contexto.
         """
-        return name in self.scope or (self.parent is not None and name in self.parent)
+        ctx = self
+        while ctx is not None:
+            if name in ctx.scope:
+                return True
+            ctx = ctx.parent
+        return False
 
     def var_def(self, name: str, value: "Value") -> None:
         """
@@ -141,12 +156,14 @@ class Ctx:
         """
         Encontra a ocorrência de key mais próxima do topo da pilha e troca seu valor por value.
         """
-        if key in self.scope:
-            self.scope[key] = value
-        elif self.parent is not None:
-            self.parent.assign(key, value)
-        else:
-            raise KeyError(f"Variable '{key}' not found in any scope.")
+        ctx = self
+        while ctx is not None:
+            scope = ctx.scope
+            if key in scope:
+                scope[key] = value
+                return
+            ctx = ctx.parent
+        raise KeyError(f"Variable '{key}' not found in any scope.")
 
 
 def pretty_scope(env: ScopeDict, index: int) -> str:
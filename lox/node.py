@@ -62,6 +62,8 @@ class Node(ABC):
         Um nó é considerado uma folha se não tem filhos do tipo `Node`.
         """
         for name in self.__annotations__:
+            if name.startswith("_"):
+                continue
             value = getattr(self, name)
             if isinstance(value, (Node, list, tuple, dict)):
                 return False
@@ -91,6 +93,9 @@ class Node(ABC):
         # atributos declarados e seus tipos correspondentes. Vamos pegar os tipos
         # na ordem de declaração e imprimir o nome e valores correspondentes
         for attr in self.__annotations__:
+            # Atributos privados são caches internos, não filhos da árvore
+            if attr.startswith("_"):
+                continue
             # attr é o nome do atributo. Obtemos o valor do atributo usando a
             # função `getattr` do Python
             value = getattr(self, attr)
@@ -160,6 +165,8 @@ class Node(ABC):
 
         # Primeiro visitamos os filhos do nó atual.
         for name in self.__annotations__:
+            if name.startswith("_"):
+                continue
             value = getattr(self, name)
             if isinstance(value, Node):
                 value.visit(visitors)
@@ -184,6 +191,8 @@ class Node(ABC):
         recursiva.
         """
         for name in self.__annotations__:
+            if name.startswith("_"):
+                continue
             value = getattr(self, name)
             if isinstance(value, Node):
                 yield value
@@ -204,6 +213,8 @@ class Node(ABC):
         Transformer.
         """
         for name in self.__annotations__:
+            if name.startswith("_"):
+                continue
             value = getattr(self, name)
             if isinstance(value, (Tree, Token)):
                 yield value
@@ -259,6 +270,8 @@ class Node(ABC):
         nó. Isso é útil para modificar a árvore sintática de forma recursiva.
         """
         for name in self.__annotations__:
+            if name.startswith("_"):
+                continue
             value = getattr(self, name)
             if isinstance(value, Node):
                 if value is old:
@@ -406,6 +419,32 @@ class Cursor(Generic[N]):
             for child in self.children():
                 yield from child.descendants(skip)
 
+    def nearest(self, scope: type[Node]) -> Optional["Cursor[Node]"]:
+        """
+        Retorna o cursor do ancestral mais próximo do tipo dado (incluindo o
+        próprio nó), ou None se não houver.
+
+        O resultado é memoizado por cursor: como os cursores pais são
+        compartilhados entre os irmãos, validações que consultam os mesmos
+        ancestrais várias vezes não repetem a caminhada até a raiz.
+        """
+        try:
+            cache = self._nearest_cache
+        except AttributeError:
+            cache = self._nearest_cache = {}
+        try:
+            return cache[scope]
+        except KeyError:
+            pass
+        if isinstance(self.node, scope):
+            result = self
+        elif self.parent_cursor is None:
+            result = None
+        else:
+            result = self.parent_cursor.nearest(scope)
+        cache[scope] = result
+        return result
+
     def is_scoped_to(self, scope: type[Node]) -> bool:
         """
         Verifica se o nó atual está definido dentro de um escopo específico.
@@ -495,7 +534,17 @@ def visit_once(obj: Node, visitors: dict[type[Node], Callable[[N], Any]]) -> Non
     """
     Visita um nó e executa a primeira função consistente com o tipo do objecto.
     """
-    for subtype in type(obj).mro():
+    # Caso comum: o tipo exato está no dicionário e a visita vira uma única
+    # consulta, sem percorrer o MRO.
+    try:
+        visitor = visitors[type(obj)]
+    except KeyError:
+        pass
+    else:
+        visitor(obj)  # type: ignore
+        return
+
+    for subtype in type(obj).mro()[1:]:
         try:
             visitor = visitors[subtype]
             visitor(obj)  # type: ignore
@@ -513,6 +562,8 @@ def can_print_as_leaf(node: Node) -> bool:
     while node:
         args = []
         for attr in node.__annotations__:
+            if attr.startswith("_"):
+                continue
             obj = getattr(node, attr)
             if isinstance(obj, (list, tuple)) and obj:
                 return False
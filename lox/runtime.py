@@ -2,7 +2,7 @@ import builtins
 from dataclasses import dataclass
 from operator import add, eq, ge, gt, le, lt, mul, ne, neg, not_, sub, truediv
 from types import FunctionType, BuiltinFunctionType
-from typing import TYPE_CHECKING, Optional, TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
 
 from .ctx import Ctx
 
@@ -44,6 +44,10 @@ class LoxReturn(Exception):
         super().__init__()
 
 
+# Marcador para planos de execução em que 'return' aninhado exige a exceção.
+_RETURN_BY_EXCEPTION = object()
+
+
 @dataclass
 class LoxFunction:
     """
@@ -55,15 +59,34 @@ class LoxFunction:
     body: list["Stmt"]
     ctx: Ctx
     is_bound_method: bool = False
+    # Decidido em bind(): construtor é método vinculado chamado 'init', e
+    # nesse caso 'this' está garantido no contexto por construção.
+    _is_init: bool = False
 
     def __call__(self, *args):
         env = dict(zip(self.args, args, strict=True))
         call_ctx = self.ctx.push(env)
-        # Only treat as init constructor if it's a bound method named 'init'
-        is_init = self.name == 'init' and self.is_bound_method and 'this' in call_ctx
+        is_init = self._is_init
+        # Compila o corpo uma única vez; chamadas seguintes só percorrem a
+        # lista de funções já resolvidas.
+        try:
+            thunks, tail = self._plan
+        except AttributeError:
+            thunks, tail = self._plan = self._make_plan()
+
+        if tail is not _RETURN_BY_EXCEPTION:
+            # Caminho rápido: o único 'return' possível é o último comando
+            # (ou não há nenhum); devolve o valor sem levantar exceção.
+            for thunk in thunks:
+                thunk(call_ctx)
+            result = tail(call_ctx) if tail is not None else None
+            if is_init:
+                return call_ctx['this']
+            return result
+
         try:
-            for stmt in self.body:
-                stmt.eval(call_ctx)
+            for thunk in thunks:
+                thunk(call_ctx)
         except LoxReturn as e:
             # Se for init, sempre retorna this
             if is_init:
@@ -74,15 +97,53 @@ class LoxFunction:
             return call_ctx['this']
         return None
 
+    def _make_plan(self):
+        """
+        Pré-compila o corpo e decide como tratar 'return'.
+
+        Retorna (thunks, tail): se `tail` é uma função, o corpo termina em um
+        'return' de topo e nenhum outro 'return' aparece antes, então o valor
+        pode ser devolvido diretamente; se é None, não há 'return' algum; se é
+        o marcador _RETURN_BY_EXCEPTION, 'return' aninhado exige a exceção.
+        """
+        from .ast import Return  # import tardio: ast depende deste módulo
+
+        body = list(self.body)
+        if body and isinstance(body[-1], Return):
+            head = body[:-1]
+            nested = any(
+                isinstance(node, Return)
+                for stmt in head
+                for node in stmt.descendants()
+            )
+            if not nested:
+                return [stmt.compile() for stmt in head], body[-1].expr.compile()
+        else:
+            nested = any(
+                isinstance(node, Return)
+                for stmt in body
+                for node in stmt.descendants()
+            )
+            if not nested:
+                return [stmt.compile() for stmt in body], None
+        return [stmt.compile() for stmt in body], _RETURN_BY_EXCEPTION
+
     def bind(self, obj):
         # Retorna uma nova função LoxFunction com o contexto extendido com {'this': obj}
-        return LoxFunction(
+        fn = LoxFunction(
             name=self.name,
             args=self.args,
             body=self.body,
             ctx=self.ctx.push({'this': obj}),
-            is_bound_method=True
+            is_bound_method=True,
+            _is_init=self.name == 'init',
         )
+        # O corpo compilado não depende do contexto; pode ser compartilhado.
+        try:
+            fn._plan = self._plan
+        except AttributeError:
+            pass
+        return fn
 
 
 @dataclass
@@ -116,58 +177,70 @@ class LoxClass:
         return instance
 
     def get_method(self, name: str) -> 'LoxFunction | None':
-        name = str(name).strip()
-        if name in self.methods:
-            return self.methods[name]
-        if self.base is not None:
-            return self.base.get_method(name)
+        # O dicionário de métodos já vem achatado de Class.eval (copia os da
+        # superclasse antes de sobrepor os próprios), então uma consulta
+        # resolve; a caminhada pelas bases fica como reserva para classes
+        # montadas à mão com tabelas incompletas. Os nomes chegam como str
+        # limpos do transformer, então não há normalização por despacho.
+        method = self.methods.get(name)
+        if method is not None:
+            return method
+        base = self.base
+        while base is not None:
+            method = base.methods.get(name)
+            if method is not None:
+                return method
+            base = base.base
         return None
 
 
 class LoxInstance:
     """
     Representa uma instância de uma classe Lox.
+
+    Os atributos Python ficam restritos aos slots abaixo; os campos Lox moram
+    todos em `fields` e o acesso a eles passa sempre por get()/set() — o
+    interpretador não usa getattr/setattr genéricos sobre instâncias Lox.
     """
+
+    __slots__ = ("klass", "fields", "_bound_cache")
+
     def __init__(self, klass: 'LoxClass'):
-        super().__setattr__('klass', klass)
-        super().__setattr__('fields', {})
+        self.klass = klass
+        self.fields = {}
+        self._bound_cache = {}
 
     def get(self, name):
         """
         Obtém um atributo ou método da instância.
         """
-        fields = super().__getattribute__('fields')
+        fields = self.fields
         if name in fields:
             return fields[name]
-        klass = super().__getattribute__('klass')
+        klass = self.klass
+        # Métodos vinculados são criados uma única vez por instância; os
+        # métodos da classe não mudam depois da criação.
+        cache = self._bound_cache
+        try:
+            return cache[name]
+        except KeyError:
+            pass
         method = klass.get_method(name)
         if method is not None:
-            return method.bind(self)
+            bound = cache[name] = method.bind(self)
+            return bound
         raise AttributeError(f"'{klass.name}' instance has no attribute '{name}'")
 
     def set(self, name, value):
         """
         Define um atributo da instância.
         """
-        fields = super().__getattribute__('fields')
-        fields[name] = value
+        self.fields[name] = value
 
     def __getattr__(self, name):
-        fields = super().__getattribute__('fields')
-        if name in fields:
-            return fields[name]
-        klass = super().__getattribute__('klass')
-        method = klass.get_method(name)
-        if method is not None:
-            return method.bind(self)
-        raise AttributeError(f"'{klass.name}' instance has no attribute '{name}'")
-
-    def __setattr__(self, name, value):
-        if name in ("klass", "fields"):
-            super().__setattr__(name, value)
-        else:
-            fields = super().__getattribute__('fields')
-            fields[name] = value
+        # Conveniência para código Python (ex.: testes fazem u.x); só dispara
+        # quando o nome não é um dos slots, então não custa no interpretador.
+        return self.get(name)
 
     def init(self, *args):
         # Permite chamada manual de init: u.init(...)
@@ -196,23 +269,49 @@ def print(value: "Value"):
     builtins.print(show(value))
 
 
+def _show_float(value: float) -> str:
+    # Números inteiros são mostrados sem a parte decimal
+    if value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# Despacho por tipo exato: uma consulta de dicionário substitui a cadeia de
+# testes de show(). Tipos fora da tabela (ex.: subclasses) caem no fallback.
+_SHOW_BY_TYPE: dict[type, Callable] = {
+    type(None): lambda value: "nil",
+    bool: lambda value: "true" if value else "false",
+    float: _show_float,
+    str: lambda value: value,
+    LoxFunction: lambda value: f"<fn {value.name}>",
+    LoxClass: lambda value: value.name,
+    LoxInstance: lambda value: f"{value.klass.name} instance",
+    FunctionType: lambda value: "<native fn>",
+    BuiltinFunctionType: lambda value: "<native fn>",
+}
+
+
 def show(value: "Value") -> str:
     """
     Converte valor lox para string no formato Lox.
     """
-    # None (nil)
-    if value is None:
-        return "nil"
-    # Booleanos
-    if value is True:
-        return "true"
-    if value is False:
-        return "false"
-    # Números inteiros
+    # Strings são o caso mais comum em prints e já estão no formato final.
+    if type(value) is str:
+        return value
+    try:
+        fn = _SHOW_BY_TYPE[type(value)]
+    except KeyError:
+        return _show_fallback(value)
+    return fn(value)
+
+
+def _show_fallback(value: "Value") -> str:
+    """
+    Caminho lento de show() para tipos fora da tabela de despacho.
+    """
+    # Números (inclui subclasses de float)
     if isinstance(value, float):
-        if value.is_integer():
-            return str(int(value))
-        return str(value)
+        return _show_float(value)
     # Função Lox
     if hasattr(value, "__class__") and value.__class__.__name__ == "LoxFunction":
         return f"<fn {getattr(value, 'name', '?')}>"
@@ -246,9 +345,7 @@ def truthy(value: "Value") -> bool:
     """
     Converte valor lox para booleano segundo a semântica do lox.
     """
-    if value is None or value is False:
-        return False
-    return True
+    return value is not None and value is not False
 
 
 def lox_eq(a, b):
@@ -263,29 +360,40 @@ def lox_ne(a, b):
 
 
 def lox_add(a, b):
+    # type(x) is float evita a caminhada de __instancecheck__ no caminho
+    # quente; o isinstance fica como caminho lento para subclasses (ex.:
+    # valores numéricos injetados no ambiente pelos testes).
     # Soma de números
-    if isinstance(a, float) and isinstance(b, float):
+    if type(a) is float and type(b) is float:
         return a + b
     # Concatenação de strings
+    if type(a) is str and type(b) is str:
+        return a + b
+    if isinstance(a, float) and isinstance(b, float):
+        return a + b
     if isinstance(a, str) and isinstance(b, str):
         return a + b
     raise LoxError("Operands must be two numbers or two strings.")
 
 
 def lox_sub(a, b):
+    if type(a) is float and type(b) is float:
+        return a - b
     if isinstance(a, float) and isinstance(b, float):
         return a - b
     raise LoxError("Operands must be numbers.")
 
 
 def lox_mul(a, b):
+    if type(a) is float and type(b) is float:
+        return a * b
     if isinstance(a, float) and isinstance(b, float):
         return a * b
     raise LoxError("Operands must be numbers.")
 
 
 def lox_div(a, b):
-    if isinstance(a, float) and isinstance(b, float):
+    if type(a) is float and type(b) is float or isinstance(a, float) and isinstance(b, float):
         if b == 0:
             raise LoxError("Division by zero.")
         return a / b
@@ -293,30 +401,38 @@ def lox_div(a, b):
 
 
 def lox_neg(a):
-    if isinstance(a, float):
+    if type(a) is float or isinstance(a, float):
         return -a
     raise LoxError("Operand must be a number.")
 
 
 def lox_gt(a, b):
+    if type(a) is float and type(b) is float:
+        return a > b
     if isinstance(a, float) and isinstance(b, float):
         return a > b
     raise LoxError("Operands must be numbers.")
 
 
 def lox_ge(a, b):
+    if type(a) is float and type(b) is float:
+        return a >= b
     if isinstance(a, float) and isinstance(b, float):
         return a >= b
     raise LoxError("Operands must be numbers.")
 
 
 def lox_lt(a, b):
+    if type(a) is float and type(b) is float:
+        return a < b
     if isinstance(a, float) and isinstance(b, float):
         return a < b
     raise LoxError("Operands must be numbers.")
 
 
 def lox_le(a, b):
+    if type(a) is float and type(b) is float:
+        return a <= b
     if isinstance(a, float) and isinstance(b, float):
         return a <= b
     raise LoxError("Operands must be numbers.")
@@ -7,136 +7,156 @@ A resolução de vários exercícios requer a modificação ou implementação d
 métodos desta classe.
 """
 
+from itertools import chain
 from typing import Callable
-from lark import Transformer, v_args
+
+from lark import v_args
+from lark.visitors import Transformer_NonRecursive
+from lark.exceptions import UnexpectedToken
 
 from . import runtime as op
 from .ast import BinOp, Block, UnaryOp, Program, Expr, Stmt, Function, Class, Var, Literal, Return, VarDef, If, While, Assign, Block as AstBlock, Print, Call, Getattr, Setattr, And, Or, Super, This
 
 
-def op_handler_str(op_str: str):
-    """
-    Fábrica de métodos que lidam com operações binárias na árvore sintática.
+# Literais singleton: true/false/nil são imutáveis e folhas da árvore, então
+# toda ocorrência — em tokens ou no açúcar sintático — compartilha o mesmo nó.
+_LIT_TRUE = Literal(True)
+_LIT_FALSE = Literal(False)
+_LIT_NIL = Literal(None)
+
+_RESERVED_WORDS = frozenset({
+    "true", "false", "nil", "return", "class", "fun", "var", "if", "else",
+    "while", "for", "print", "super", "this",
+})
 
-    Recebe a função que implementa a operação em tempo de execução.
-    """
 
-    def method(self, left, right):
-        return BinOp(left, right, op_str)
+# Construtores de operações unárias indexados pelo lexema do operador
+_UNARY_BUILDERS = {
+    '!': lambda value: UnaryOp('!', value),
+    '-': lambda value: UnaryOp('-', value),
+}
 
-    return method
+
+def _stmt_group(stmt):
+    """
+    Normaliza um comando (ou lista de comandos vinda de declarações) para um
+    iterável, permitindo achatar program/block em uma única passada.
+    """
+    return stmt if type(stmt) is list else (stmt,)
 
 
 @v_args(inline=True)
-class LoxTransformer(Transformer):
+class LoxTransformer(Transformer_NonRecursive):
+    def __init__(self):
+        super().__init__()
+        # Nomes e números se repetem o tempo todo no fonte; como Var e
+        # Literal são folhas imutáveis, cada valor vira um único nó.
+        self._var_cache: dict[str, Var] = {}
+        self._num_cache: dict[float, Literal] = {}
+
     # Programa
     def program(self, *stmts):
-        # Flatten nested lists that might come from declarations
-        flat_stmts = []
-        for stmt in stmts:
-            if isinstance(stmt, list):
-                flat_stmts.extend(stmt)
-            else:
-                flat_stmts.append(stmt)
-        return Program(flat_stmts)
-
-    # Operações matemáticas básicas
-    mul = op_handler_str('*')
-    div = op_handler_str('/')
-    sub = op_handler_str('-')
-    add = op_handler_str('+')
+        # Achata listas aninhadas vindas de declarações em uma passada só
+        return Program(list(chain.from_iterable(map(_stmt_group, stmts))))
+
+    # Operações matemáticas básicas: métodos explícitos com o operador como
+    # literal, sem a indireção de célula de closure da antiga fábrica.
+    def mul(self, left, right):
+        return BinOp(left, right, '*')
+
+    def div(self, left, right):
+        return BinOp(left, right, '/')
+
+    def sub(self, left, right):
+        return BinOp(left, right, '-')
+
+    def add(self, left, right):
+        return BinOp(left, right, '+')
 
     # Comparações
-    gt = op_handler_str('>')
-    lt = op_handler_str('<')
-    ge = op_handler_str('>=')
-    le = op_handler_str('<=')
-    eq = op_handler_str('==')
-    ne = op_handler_str('!=')
+    def gt(self, left, right):
+        return BinOp(left, right, '>')
+
+    def lt(self, left, right):
+        return BinOp(left, right, '<')
+
+    def ge(self, left, right):
+        return BinOp(left, right, '>=')
+
+    def le(self, left, right):
+        return BinOp(left, right, '<=')
+
+    def eq(self, left, right):
+        return BinOp(left, right, '==')
+
+    def ne(self, left, right):
+        return BinOp(left, right, '!=')
 
     # Outras expressões
     def call(self, func, params):
         return Call(func, params)
 
     def params(self, *args):
-        params = list(args)
-        return params
+        # Os argumentos só são iterados em Call; a tupla de *args serve
+        # direto, sem cópia para lista.
+        return args
 
     def params_list(self, *args):
         # Sempre retorna lista de nomes (strings ou Var)
-        return [a.name if hasattr(a, 'name') else a for a in args]
+        return [a.name if isinstance(a, Var) else a for a in args]
 
     # Comandos
     def print_cmd(self, expr):
         return Print(expr)
 
-    RESERVED_WORDS = {
-        "true", "false", "nil", "return", "class", "fun", "var", "if", "else", "while", "for", "print", "super", "this"
-    }
-
     def VAR(self, token):
+        # A checagem não é redundante com as prioridades da gramática: o
+        # lexer contextual do LALR só considera os terminais esperados no
+        # estado atual, então depois de 'var'/'fun' uma palavra reservada
+        # casa com VAR e precisa ser rejeitada aqui.
         name = str(token)
-        if name in self.RESERVED_WORDS:
-            from lark.exceptions import UnexpectedToken
+        if name in _RESERVED_WORDS:
             raise UnexpectedToken(token, expected=None)
-        return Var(name)
+        var = self._var_cache.get(name)
+        if var is None:
+            var = self._var_cache[name] = Var(name)
+        return var
 
     def NUMBER(self, token):
         num = float(token)
-        return Literal(num)
+        lit = self._num_cache.get(num)
+        if lit is None:
+            lit = self._num_cache[num] = Literal(num)
+        return lit
     
     def STRING(self, token):
         text = str(token)[1:-1]
         return Literal(text)
     
     def NIL(self, _):
-        return Literal(None)
+        return _LIT_NIL
 
     def BOOL(self, token):
-        return Literal(token == "true")
-
-    def primary(self, *args):
-        from lark import Token
-        # Handle empty primary (which usually means a consumed token)
-        if len(args) == 0:
-            # This is likely a THIS token that was consumed somewhere
-            return This()
-        elif len(args) == 1 and isinstance(args[0], Token):
-            if args[0].type == 'THIS':
-                return This()
-            elif args[0].type == 'SUPER':
-                # Super alone doesn't make sense, but we'll handle it
-                return None
-        # For other cases, return the argument as-is
-        return args[0] if len(args) == 1 else args
+        # BOOL só casa "true" ou "false"; o primeiro caractere decide
+        return _LIT_TRUE if token[0] == 't' else _LIT_FALSE
+
+    def this_expr(self):
+        return This()
+
+    def super_expr(self):
+        # 'super' sozinho só é válido como objeto de um acesso super.m;
+        # getattr completa o nome do método.
+        return Super("")
 
     def getattr(self, obj, attr):
-        # Handle super.attr and this.attr cases
-        from lark import Tree, Token
-        
-        # Special case: empty primary tree usually means a token was consumed but not preserved
-        if isinstance(obj, Tree) and obj.data == 'primary' and len(obj.children) == 0:
-            # This likely means a THIS or SUPER token was processed somewhere else
-            # For now, we'll assume it's THIS since SUPER alone doesn't make sense
-            return Getattr(This(), attr.name)
-        
-        if isinstance(obj, Tree) and obj.data == 'primary' and len(obj.children) == 1:
-            child = obj.children[0]
-            if isinstance(child, Token):
-                if child.type == 'SUPER':
-                    return Super(attr.name)
-                elif child.type == 'THIS':
-                    return Getattr(This(), attr.name)
-        
+        # A gramática já entrega This()/Super() prontos, então não há mais
+        # Tree cru para inspecionar aqui. Só o sentinela de 'super' sem nome
+        # é completado; super.a.b deve virar Getattr(Super('a'), 'b').
+        if isinstance(obj, Super) and not obj.attr:
+            return Super(attr.name)
         return Getattr(obj, attr.name)
 
     def setattr_expr(self, obj, attr, value):
-        # Handle this.attr = value case
-        from lark import Tree
-        if isinstance(obj, Tree) and obj.data == 'primary' and len(obj.children) == 0:
-            # This likely means a THIS token was processed somewhere else
-            return Setattr(This(), attr.name, value)
-        
         return Setattr(obj, attr.name, value)
 
     def not_(self, value):
@@ -147,33 +167,32 @@ class LoxTransformer(Transformer):
 
     # Adicionando suporte a operações unárias na árvore sintática
     def test(self, op, value):
-        if op == '!':
-            return UnaryOp('!', value)
-        elif op == '-':
-            return UnaryOp('-', value)
-        return value
+        build = _UNARY_BUILDERS.get(op)
+        return build(value) if build is not None else value
 
-    def and_(self, *args):
+    def and_(self, *args, _node=And):
         # If only one argument, just return it unwrapped
         if len(args) == 1:
             return args[0]
-        expr = args[0]
-        for next_expr in args[1:]:
-            expr = And(expr, next_expr)
+        # Itera sem fatiar args (evita a tupla nova) e com o construtor em
+        # variável local em vez de global por iteração.
+        it = iter(args)
+        expr = next(it)
+        for next_expr in it:
+            expr = _node(expr, next_expr)
         return expr
 
-    def or_(self, *args):
+    def or_(self, *args, _node=Or):
         # If only one argument, just return it unwrapped
         if len(args) == 1:
             return args[0]
-        expr = args[0]
-        for next_expr in args[1:]:
-            expr = Or(expr, next_expr)
+        it = iter(args)
+        expr = next(it)
+        for next_expr in it:
+            expr = _node(expr, next_expr)
         return expr
 
     def assign(self, var, value):
-        # Se for atribuição a campo (obj.x = ...), gera Setattr
-        from .ast import Setattr, Getattr, Var
         if isinstance(var, Getattr):
             return Setattr(var.obj, var.attr, value)
         # Se var é um objeto Var, extrai o nome
@@ -183,7 +202,7 @@ class LoxTransformer(Transformer):
 
     def var_decl(self, name, value=None):
         if value is None:
-            value = Literal(None)
+            value = _LIT_NIL
         return VarDef(name.name, value)
 
     def declaration(self, node):
@@ -193,14 +212,8 @@ class LoxTransformer(Transformer):
         return node
 
     def block(self, *stmts):
-        # Flatten nested lists that might come from declarations
-        flat_stmts = []
-        for stmt in stmts:
-            if isinstance(stmt, list):
-                flat_stmts.extend(stmt)
-            else:
-                flat_stmts.append(stmt)
-        return Block(flat_stmts)
+        # Achata listas aninhadas vindas de declarações em uma passada só
+        return Block(list(chain.from_iterable(map(_stmt_group, stmts))))
 
     def if_stmt(self, cond, then_branch, else_branch=None):
         return If(cond, then_branch, else_branch)
@@ -210,36 +223,33 @@ class LoxTransformer(Transformer):
 
     def return_stmt(self, expr=None):
         if expr is None:
-            expr = Literal(None)
-        elif isinstance(expr, list):
-            # Deeply flatten nested lists
-            def flatten(lst):
-                if not isinstance(lst, list):
-                    return lst
-                if len(lst) == 1:
-                    return flatten(lst[0])
-                return lst
-            expr = flatten(expr)
+            expr = _LIT_NIL
+        else:
+            # Desembrulha listas unitárias aninhadas sem recursão
+            while type(expr) is list and len(expr) == 1:
+                expr = expr[0]
         return Return(expr)
 
     def for_stmt(self, init, cond, incr, body):
         # Açúcar sintático: for (init; cond; incr) body => { init; while (cond) { body; incr } }
-        from .ast import Block, While, Literal
         # cond pode ser None (empty_cond), nesse caso vira Literal(True)
         if cond is None:
-            cond = Literal(True)
-        # incr pode ser None (empty_incr), nesse caso vira Literal(None)
-        if incr is None:
-            incr = Literal(None)
-        # init pode ser None (empty_init), nesse caso vira Literal(None)
-        if init is None:
-            init = Literal(None)
-        # Corpo do while: body + incr
+            cond = _LIT_TRUE
+        # O bloco do corpo acabou de ser construído para este for, então o
+        # incremento pode ser acrescentado no lugar, sem copiar a lista.
         if isinstance(body, Block):
-            while_body = Block(body.stmts + [incr])
-        else:
+            if incr is not None:
+                body.stmts.append(incr)
+            while_body = body
+        elif incr is not None:
             while_body = Block([body, incr])
-        return Block([init, While(cond, while_body)])
+        else:
+            while_body = Block([body])
+        loop = While(cond, while_body)
+        # Sem inicializador não há o que isolar em um escopo externo.
+        if init is None:
+            return loop
+        return Block([init, loop])
 
     def for_init(self, node):
         return node
@@ -258,140 +268,61 @@ class LoxTransformer(Transformer):
     def empty_incr(self):
         return None
 
-    def method_decl(self, *args):
-        from .ast import Block
-        
+    def _callable_parts(self, args):
+        """
+        Normaliza os argumentos de method_decl/function_decl para a tripla
+        (name, params, body), em um fluxo linear sem recomputar len(args).
+        """
         # Handle both cases: individual args or a list
         if len(args) == 1 and isinstance(args[0], list):
             args = args[0]
-        
-        name = args[0] if args else None
-        # For methods without parameters, args[1] should be the body directly
-        if len(args) == 2:
+
+        n = len(args)
+        name = args[0] if n else None
+        # Declarações sem parâmetros recebem o corpo direto em args[1]
+        if n == 2:
             params = []
             body = args[1]
         else:
-            params = args[1] if len(args) > 1 else None
-            body = args[2] if len(args) > 2 else None
-        
+            params = args[1] if n > 1 else None
+            body = args[2] if n > 2 else None
+
         # Handle params
-        if params is None:
-            params = []
-        elif isinstance(params, Block):
+        if params is None or isinstance(params, Block):
             params = []
         elif isinstance(params, list):
-            params = [p.name if hasattr(p, 'name') else p for p in params]
+            params = [p.name if isinstance(p, Var) else p for p in params]
         else:
-            params = [params.name if hasattr(params, 'name') else params]
-            
+            params = [params.name if isinstance(params, Var) else params]
+
         # Handle body
         if body is None:
             body = Block([])
         elif not isinstance(body, Block):
             body = Block([body])
-            
-        method_name = name.name if hasattr(name, 'name') else str(name)
+
+        return name, params, body
+
+    def method_decl(self, *args):
+        name, params, body = self._callable_parts(args)
+        method_name = name.name if isinstance(name, Var) else str(name)
         return Function(method_name, params, body)
 
     def function_decl(self, *args):
-        from .ast import Block
-        
-        # Handle both cases: individual args or a list
-        if len(args) == 1 and isinstance(args[0], list):
-            args = args[0]
-        
-        name = args[0] if args else None
-        # For functions without parameters, args[1] should be the body directly
-        if len(args) == 2:
-            params = []
-            body = args[1]
-        else:
-            params = args[1] if len(args) > 1 else None
-            body = args[2] if len(args) > 2 else None
-        
-        # Handle params
-        if params is None:
-            params = []
-        elif isinstance(params, Block):
-            params = []
-            
-        # Handle body
-        if body is None:
-            body = Block([])
-        elif not isinstance(body, Block):
-            body = Block([body])
-            
-        func_name = name.name if hasattr(name, 'name') else name
+        name, params, body = self._callable_parts(args)
+        func_name = name.name if isinstance(name, Var) else name
         return Function(func_name, params, body)
 
-    def class_decl(self, *args):
-        from lark.tree import Tree
-        from .ast import Function
-        
-        # Handle both cases: individual args or a list
-        if len(args) == 1 and isinstance(args[0], list):
-            args = args[0]
-        
-        name = args[0] if args else None
-        
-        # Determine if there's a superclass by checking arguments
-        if len(args) == 2:
-            # class Name { ... } - no superclass
-            superclass = None
-            body = args[1]
-        elif len(args) == 3:
-            # class Name < Super { ... } or class Name { ... } with complex parsing
-            if isinstance(args[1], list) and all(isinstance(x, Function) for x in args[1]):
-                # It's actually class Name { methods... } - no superclass
-                superclass = None
-                body = args[1]
-            else:
-                # class Name < Super { ... }
-                superclass = args[1]
-                body = args[2]
-        else:
-            superclass = None
-            body = None
-        
-        # Clean up superclass (remove Trees e listas aninhadas)
-        if superclass is None or (isinstance(superclass, list) and not superclass):
-            superclass = None
-        elif isinstance(superclass, list):
-            superclass = superclass[0]
-        if isinstance(superclass, Tree):
-            superclass = None
-        # Se superclass for um método (Function), mas não há '<', deve ser None
-        if isinstance(superclass, Function):
-            superclass = None
-            
-        # Handle body/methods
-        if body is None:
-            methods = []
-        elif isinstance(body, list):
-            methods = [m for m in body if isinstance(m, Function)]
-        elif isinstance(body, Function):
-            methods = [body]
-        else:
-            methods = []
-            
-        class_name = name.name if hasattr(name, 'name') else name
-        return Class(
-            name=class_name,
-            superclass=superclass,
-            methods=methods
-        )
+    def class_decl(self, name, body):
+        # A gramática separa os dois formatos de classe em regras próprias,
+        # então não é preciso redescobrir aqui se há superclasse.
+        return Class(name=name.name, superclass=None, methods=body)
+
+    def class_decl_sub(self, name, superclass, body):
+        return Class(name=name.name, superclass=superclass, methods=body)
 
     def class_body(self, *methods):
-        # Garante que sempre retorna lista plana de métodos Function
-        from .ast import Function
-        method_list = []
-        for m in methods:
-            if isinstance(m, list):
-                for x in m:
-                    if isinstance(x, Function):
-                        method_list.append(x)
-            elif isinstance(m, Function):
-                method_list.append(m)
-            elif hasattr(m, 'name') and hasattr(m, 'params') and hasattr(m, 'body'):
-                method_list.append(Function(m.name, m.params, m.body))
-        return method_list
\ No newline at end of file
+        # Achata listas aninhadas e filtra em uma passada; method_decl já
+        # devolve nós Function prontos, sem necessidade de reconstrução.
+        flat = chain.from_iterable(map(_stmt_group, methods))
+        return [m for m in flat if isinstance(m, Function)]
\ No newline at end of file